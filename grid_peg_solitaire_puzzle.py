@@ -1,13 +1,29 @@
 from puzzle import Puzzle
-from copy import deepcopy
+
+# markers a grid may use
+_PEG, _HOLE, _UNUSED = "*", ".", "#"
+_MARKER_SET = frozenset({_PEG, _HOLE, _UNUSED})
 
 
 class GridPegSolitairePuzzle(Puzzle):
     """
     Snapshot of peg solitaire on a rectangular grid. May be solved,
     unsolved, or even unsolvable.
+
+    The grid is stored as three bitboards, numbering positions row by row:
+    bit (row * columns + column) is set in self._pegs if that position
+    holds a peg, in self._holes if it is empty, and in self._unused if it
+    is not part of the board.
     """
 
+    # masks of the positions a peg can jump from towards the left, right,
+    # top and bottom of the grid, keyed by (rows, columns)
+    _jump_masks = {}
+
+    # tables for moving pegs by each symmetry of a board, keyed by
+    # (rows, columns, unused positions)
+    _symmetry_tables = {}
+
     def __init__(self, marker, marker_set):
         """
         Create a new GridPegSolitairePuzzle self with
@@ -22,8 +38,22 @@ class GridPegSolitairePuzzle(Puzzle):
         assert len(marker) > 0
         assert all([len(x) == len(marker[0]) for x in marker[1:]])
         assert all([all(x in marker_set for x in row) for row in marker])
-        assert all([x == "*" or x == "." or x == "#" for x in marker_set])
-        self._marker, self._marker_set = marker, marker_set
+        assert _MARKER_SET.issuperset(marker_set)
+        # share one frozen set between puzzles allowing every marker, rather
+        # than keeping a reference to the caller's set
+        self._marker_set = (_MARKER_SET if marker_set == _MARKER_SET
+                            else frozenset(marker_set))
+        self._rows, self._cols = len(marker), len(marker[0])
+        self._pegs = self._holes = self._unused = 0
+        for row in range(self._rows):
+            for column in range(self._cols):
+                bit = 1 << (row * self._cols + column)
+                if marker[row][column] == _PEG:
+                    self._pegs |= bit
+                elif marker[row][column] == _HOLE:
+                    self._holes |= bit
+                else:
+                    self._unused |= bit
 
     def __eq__(self, other):
         """
@@ -57,8 +87,21 @@ class GridPegSolitairePuzzle(Puzzle):
         False
         """
         return (type(self) == type(other) and
-                self._marker == other._marker and
-                self._marker_set == other._marker_set)
+                self._pegs == other._pegs and
+                self._holes == other._holes and
+                self._unused == other._unused and
+                self._rows == other._rows and
+                self._cols == other._cols)
+
+    def __hash__(self):
+        """
+        Return a hash of GridPegSolitairePuzzle self, consistent with
+        __eq__, so it can be stored in the solvers' set of seen puzzles.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+        """
+        return hash(self._pegs)
 
     def __str__(self):
         """
@@ -82,16 +125,9 @@ class GridPegSolitairePuzzle(Puzzle):
         *****
         <BLANKLINE>
         """
-        # string accumulator
-        result = "\n"
-
-        # add each list from self._marker as a line to result
-        for line in self._marker:
-            for marker in line:
-                result += marker
-            result += '\n'
-
-        return result
+        # each row of the grid as a line, between blank lines
+        return "\n" + "\n".join(["".join(line)
+                                  for line in self._grid()]) + "\n"
 
     def extensions(self):
         """
@@ -144,53 +180,32 @@ class GridPegSolitairePuzzle(Puzzle):
         # list accumulator for all extensions
         lst = []
 
-        # look for two adjacent pegs next to every hole, such that one peg can
-        # jump over the other into the hole, then create a new grid to
-        # represent each of those jumps, and add to lst
-
-        for row in range(len(self._marker)):
-            for column in range(len(self._marker[row])):
-                if self._marker[row][column] == '*':
-                    # jump to the left if possible
-                    if (column - 2) in range(len(self._marker[row])) and \
-                            self._marker[row][column - 2] == '.' and \
-                            self._marker[row][column - 1] == '*':
-                        new_grid = deepcopy(self._marker)
-                        new_grid[row] = new_grid[row][:column - 2] + \
-                            ["*", ".", "."] + new_grid[row][column + 1:]
-                        lst.append(GridPegSolitairePuzzle(new_grid, {"*", ".",
-                                                                     "#"}))
-                    # jump to the right if possible
-                    if (column + 2) in range(len(self._marker[row])) and \
-                            self._marker[row][column + 2] == '.' and \
-                            self._marker[row][column + 1] == '*':
-                        new_grid = deepcopy(self._marker)
-                        new_grid[row] = new_grid[row][:column] + \
-                            [".", ".", "*"] + new_grid[row][column + 3:]
-                        lst.append(GridPegSolitairePuzzle(new_grid, {"*", ".",
-                                                                     "#"}))
-
-                    # jump up if possible
-                    if (row - 2) in range(len(self._marker)) and \
-                            self._marker[row - 2][column] == '.' and \
-                            self._marker[row - 1][column] == '*':
-                        new_grid = deepcopy(self._marker)
-                        new_grid[row - 2][column] = "*"
-                        new_grid[row - 1][column] = "."
-                        new_grid[row][column] = "."
-                        lst.append(GridPegSolitairePuzzle(new_grid, {"*", ".",
-                                                                     "#"}))
-
-                    # jump down if possible
-                    if (row + 2) in range(len(self._marker)) and \
-                            self._marker[row + 2][column] == '.' and \
-                            self._marker[row + 1][column] == '*':
-                        new_grid = deepcopy(self._marker)
-                        new_grid[row + 2][column] = "*"
-                        new_grid[row + 1][column] = "."
-                        new_grid[row][column] = "."
-                        lst.append(GridPegSolitairePuzzle(new_grid, {"*", ".",
-                                                                     "#"}))
+        pegs, holes, cols = self._pegs, self._holes, self._cols
+        jump = self._jump
+        left_mask, right_mask, up_mask, down_mask = self._masks()
+
+        # bit b of each of these is set when the peg at b can jump over its
+        # neighbouring peg into the hole behind it, in that direction
+        left = pegs & (pegs << 1) & (holes << 2) & left_mask
+        right = pegs & (pegs >> 1) & (holes >> 2) & right_mask
+        up = pegs & (pegs << cols) & (holes << 2 * cols) & up_mask
+        down = pegs & (pegs >> cols) & (holes >> 2 * cols) & down_mask
+
+        # visit the jumping pegs from the top-left position onward, and
+        # create a new puzzle for each of their jumps
+        jumps = left | right | up | down
+        while jumps:
+            # lowest set bit of jumps
+            b = jumps & -jumps
+            jumps ^= b
+            if left & b:
+                lst.append(jump(b | b >> 1 | b >> 2))
+            if right & b:
+                lst.append(jump(b | b << 1 | b << 2))
+            if up & b:
+                lst.append(jump(b | b >> cols | b >> 2 * cols))
+            if down & b:
+                lst.append(jump(b | b << cols | b << 2 * cols))
 
         return lst
 
@@ -220,16 +235,147 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> gpsp2.is_solved()
         True
         """
-        # accumulator to count number of pegs
-        pegs = 0
+        # only solved when one peg remaining
+        return bin(self._pegs).count("1") == 1
 
-        for row in self._marker:
-            for marker in row:
-                if marker == '*':
-                    pegs += 1
+    def canonical(self):
+        """
+        Return a key that's the same for GridPegSolitairePuzzle self and
+        every reflection or rotation of it onto the same board.
 
-        # only solved when one peg remaining
-        return pegs == 1
+        Overrides Puzzle.canonical
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: (int, int, int, int)
+
+        >>> gpsp1 = GridPegSolitairePuzzle([["*", "*", ".", "*"]], \
+                                           {"*", ".", "#"})
+        >>> gpsp2 = GridPegSolitairePuzzle([["*", ".", "*", "*"]], \
+                                           {"*", ".", "#"})
+        >>> gpsp3 = GridPegSolitairePuzzle([[".", "*", "*", "*"]], \
+                                           {"*", ".", "#"})
+        >>> gpsp1.canonical() == gpsp2.canonical()
+        True
+        >>> gpsp1.canonical() == gpsp3.canonical()
+        False
+        """
+        # the smallest of the pegs bitboards of self's symmetric images
+        key = self._pegs
+        for tables in self._symmetries():
+            pegs, image = self._pegs, 0
+            # move the pegs 8 positions at a time
+            for table in tables:
+                image |= table[pegs & 255]
+                pegs >>= 8
+            if image < key:
+                key = image
+        return self._rows, self._cols, self._unused, key
+
+    # some helper methods
+    def _masks(self):
+        # Return the masks of positions a peg can jump left, right, up and
+        # down from in GridPegSolitairePuzzle self's grid, ignoring whether
+        # the positions it jumps over and into hold a peg and a hole.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: (int, int, int, int)
+        shape = (self._rows, self._cols)
+        if shape not in self._jump_masks:
+            left = right = up = down = 0
+            for row in range(self._rows):
+                for column in range(self._cols):
+                    bit = 1 << (row * self._cols + column)
+                    if column >= 2:
+                        left |= bit
+                    if column < self._cols - 2:
+                        right |= bit
+                    if row >= 2:
+                        up |= bit
+                    if row < self._rows - 2:
+                        down |= bit
+            self._jump_masks[shape] = (left, right, up, down)
+        return self._jump_masks[shape]
+
+    def _symmetries(self):
+        # Return a list with an entry for each reflection and rotation,
+        # other than the identity, that maps GridPegSolitairePuzzle self's
+        # board onto itself. Each entry is a list of tables, one per 8
+        # positions, mapping the pegs in those positions, as a byte, to the
+        # bitboard of the positions they're moved to.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: list[list[list[int]]]
+        board = (self._rows, self._cols, self._unused)
+        if board not in self._symmetry_tables:
+            rows, cols = self._rows, self._cols
+            # position each (row, column) is moved to by each symmetry
+            symmetries = [lambda r, c: (r, cols - 1 - c),
+                          lambda r, c: (rows - 1 - r, c),
+                          lambda r, c: (rows - 1 - r, cols - 1 - c)]
+            # rotations by a quarter turn and diagonal reflections only fit
+            # square grids
+            if rows == cols:
+                symmetries += [lambda r, c: (c, r),
+                               lambda r, c: (cols - 1 - c, rows - 1 - r),
+                               lambda r, c: (c, rows - 1 - r),
+                               lambda r, c: (cols - 1 - c, r)]
+            self._symmetry_tables[board] = []
+            for symmetry in symmetries:
+                moved_to = []
+                for i in range(rows * cols):
+                    r, c = symmetry(i // cols, i % cols)
+                    moved_to.append(1 << (r * cols + c))
+                # skip symmetries of the grid that don't fit the board
+                if sum([moved_to[i] for i in range(rows * cols)
+                        if self._unused >> i & 1]) != self._unused:
+                    continue
+                tables = []
+                for start in range(0, rows * cols, 8):
+                    # positions past the end of the grid never hold pegs
+                    bits = moved_to[start:start + 8] + [0] * 8
+                    table = [0] * 256
+                    for byte in range(1, 256):
+                        # extend the entry for byte without its lowest peg
+                        low = byte & -byte
+                        table[byte] = (table[byte ^ low] |
+                                       bits[low.bit_length() - 1])
+                    tables.append(table)
+                self._symmetry_tables[board].append(tables)
+        return self._symmetry_tables[board]
+
+    def _jump(self, moved):
+        # Return the GridPegSolitairePuzzle reached from self by a jump
+        # that swaps pegs and holes at the positions set in moved.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @type moved: int
+        # @rtype: GridPegSolitairePuzzle
+        new_puzzle = GridPegSolitairePuzzle.__new__(GridPegSolitairePuzzle)
+        new_puzzle._marker_set = self._marker_set
+        new_puzzle._rows, new_puzzle._cols = self._rows, self._cols
+        new_puzzle._pegs = self._pegs ^ moved
+        new_puzzle._holes = self._holes ^ moved
+        new_puzzle._unused = self._unused
+        return new_puzzle
+
+    def _grid(self):
+        # Return GridPegSolitairePuzzle self's grid as a list of rows of
+        # markers.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: list[list[str]]
+        grid = []
+        for row in range(self._rows):
+            grid.append([])
+            for column in range(self._cols):
+                bit = 1 << (row * self._cols + column)
+                if self._pegs & bit:
+                    grid[row].append(_PEG)
+                elif self._holes & bit:
+                    grid[row].append(_HOLE)
+                else:
+                    grid[row].append(_UNUSED)
+        return grid
 
 
 if __name__ == "__main__":
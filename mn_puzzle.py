@@ -5,8 +5,16 @@ class MNPuzzle(Puzzle):
     """
     An nxm puzzle, like the 15-puzzle, which may be solved, unsolved,
     or even unsolvable.
+
+    Each distinct symbol is numbered by its position in self._symbols, and
+    a configuration is stored as the bytes of its symbols' numbers, row by
+    row, with the position of the empty space kept in self._blank.
     """
 
+    # for each position of an nxm grid, the positions above, below, left
+    # and right of it that are in the grid, keyed by (n, m)
+    _neighbors = {}
+
     def __init__(self, from_grid, to_grid):
         """
         MNPuzzle in state from_grid, working towards
@@ -22,8 +30,20 @@ class MNPuzzle(Puzzle):
         assert len(from_grid) > 0
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
+        assert sum([r.count("*") for r in from_grid]) <= 1
         self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        self.to_grid = to_grid
+        self._symbols = tuple(sorted({x for r in from_grid for x in r} |
+                                     {x for r in to_grid for x in r}))
+        assert len(self._symbols) <= 256
+        numbers = {x: i for i, x in enumerate(self._symbols)}
+        self._state = bytes([numbers[x] for r in from_grid for x in r])
+        self._blank = self._state.find(numbers["*"]) if "*" in numbers else -1
+        if (len(to_grid), len(to_grid[0])) == (self.n, self.m):
+            self._to_state = bytes([numbers[x] for r in to_grid for x in r])
+        else:
+            # no configuration of self's shape can match to_grid
+            self._to_state = None
         
     def __eq__(self, other):
         """
@@ -45,11 +65,38 @@ class MNPuzzle(Puzzle):
         False
         """
         return (type(self) == type(other) and
-                self.from_grid == other.from_grid and
+                self._state == other._state and
+                self._symbols == other._symbols and
                 self.to_grid == other.to_grid and
                 self.m == other.m and
                 self.n == other.n)
 
+    def __hash__(self):
+        """
+        Return a hash of MNPuzzle self, consistent with __eq__.
+
+        @type self: MNPuzzle
+        @rtype: int
+        """
+        return hash(self._state)
+
+    @property
+    def from_grid(self):
+        """
+        Return the current configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+
+        >>> mn1 = MNPuzzle((("*", "2", "3"), ("4", "5", "1")), \
+            (("1", "2", "3"), ("4", "5", "*")))
+        >>> mn1.from_grid
+        (('*', '2', '3'), ('4', '5', '1'))
+        """
+        return tuple(tuple(self._symbols[x]
+                           for x in self._state[r * self.m:(r + 1) * self.m])
+                     for r in range(self.n))
+
     def __str__(self):
         """
         Return a string representation of MNPuzzle self.
@@ -65,15 +112,9 @@ class MNPuzzle(Puzzle):
          4 5 1
         <BLANKLINE>
         """
-        # string accumulator
-        result = "\n"
-
-        for n in self.from_grid:
-            for m in n:
-                result += " " + m
-            result += "\n"
-
-        return result
+        # each row of the grid as a line, between blank lines
+        return "\n" + "\n".join([" " + " ".join(n)
+                                  for n in self.from_grid]) + "\n"
 
     def extensions(self):
         """
@@ -102,52 +143,13 @@ class MNPuzzle(Puzzle):
         # list accumulator for all extensions
         lst = []
 
-        for row in range(self.n):
-            for column in range(self.m):
-                if self.from_grid[row][column] == "*":
-                    if row - 1 in range(self.n):
-                        # make all tuples in grid lists, for object assignment
-                        new_grid = [list(x) for x in self.from_grid]
-                        new_grid[row - 1][column] = "*"
-                        new_grid[row][column] = self.from_grid[row - 1][column]
-                        # change back to tuples, for new from_grid
-                        t = ()
-                        for n in new_grid:
-                            t += (tuple(n),)
-                        lst.append(MNPuzzle(t, self.to_grid))
-
-                    if row + 1 in range(self.n):
-                        # make all tuples in grid lists, for object assignment
-                        new_grid = [list(x) for x in self.from_grid]
-                        new_grid[row + 1][column] = "*"
-                        new_grid[row][column] = self.from_grid[row + 1][column]
-                        # change back to tuples, for new from_grid
-                        t = ()
-                        for n in new_grid:
-                            t += (tuple(n),)
-                        lst.append(MNPuzzle(t, self.to_grid))
-
-                    if column - 1 in range(self.m):
-                        # make all tuples in grid lists, for object assignment
-                        new_grid = [list(x) for x in self.from_grid]
-                        new_grid[row][column - 1] = "*"
-                        new_grid[row][column] = self.from_grid[row][column - 1]
-                        # change back to tuples, for new from_grid
-                        t = ()
-                        for n in new_grid:
-                            t += (tuple(n),)
-                        lst.append(MNPuzzle(t, self.to_grid))
-
-                    if column + 1 in range(self.m):
-                        # make all tuples in grid lists, for object assignment
-                        new_grid = [list(x) for x in self.from_grid]
-                        new_grid[row][column + 1] = "*"
-                        new_grid[row][column] = self.from_grid[row][column + 1]
-                        # change back to tuples, for new from_grid
-                        t = ()
-                        for n in new_grid:
-                            t += (tuple(n),)
-                        lst.append(MNPuzzle(t, self.to_grid))
+        # no moves without an empty space
+        if self._blank < 0:
+            return lst
+
+        # move each symbol next to the empty space into it
+        for position in self._moves()[self._blank]:
+            lst.append(self._swap(position))
         return lst
 
     def is_solved(self):
@@ -167,8 +169,54 @@ class MNPuzzle(Puzzle):
         False
         >>> mn2.is_solved()
         True
+        >>> mn3 = MNPuzzle((("1", "2", "3", "4", "5", "*"),), \
+            (("1", "2", "3"), ("4", "5", "*")))
+        >>> mn3.is_solved()
+        False
         """
-        return self.from_grid == self.to_grid
+        return self._state == self._to_state
+
+    # helper methods
+    def _moves(self):
+        # Return, for each position of MNPuzzle self's grid, the positions
+        # that can be moved into it if it's the empty space.
+        #
+        # @type self: MNPuzzle
+        # @rtype: list[tuple[int]]
+        n, m = self.n, self.m
+        if (n, m) not in self._neighbors:
+            moves = []
+            for blank in range(n * m):
+                row, column = divmod(blank, m)
+                positions = []
+                if 0 <= row - 1:
+                    positions.append(blank - m)
+                if row + 1 < n:
+                    positions.append(blank + m)
+                if 0 <= column - 1:
+                    positions.append(blank - 1)
+                if column + 1 < m:
+                    positions.append(blank + 1)
+                moves.append(tuple(positions))
+            self._neighbors[(n, m)] = moves
+        return self._neighbors[(n, m)]
+
+    def _swap(self, position):
+        # Return the MNPuzzle reached from self by moving the symbol at
+        # position into the empty space.
+        #
+        # @type self: MNPuzzle
+        # @type position: int
+        # @rtype: MNPuzzle
+        blank, state = self._blank, bytearray(self._state)
+        state[blank], state[position] = state[position], state[blank]
+        new_puzzle = MNPuzzle.__new__(MNPuzzle)
+        new_puzzle.n, new_puzzle.m, new_puzzle.to_grid = (self.n, self.m,
+                                                          self.to_grid)
+        new_puzzle._symbols, new_puzzle._to_state = (self._symbols,
+                                                     self._to_state)
+        new_puzzle._state, new_puzzle._blank = bytes(state), position
+        return new_puzzle
 
 
 if __name__ == "__main__":
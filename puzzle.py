@@ -4,6 +4,9 @@ class Puzzle:
     or even unsolvable.
     """
 
+    # no attributes of its own, so that subclasses may use __slots__
+    __slots__ = ()
+
     def fail_fast(self):
         """
         Return True iff Puzzle self can never be extended to a solution.
@@ -16,6 +19,20 @@ class Puzzle:
         """
         return False
 
+    def canonical(self):
+        """
+        Return a hashable key that's the same for Puzzle self and every
+        Puzzle that's equivalent to it up to symmetry, so that a solver only
+        needs to search one of them.
+
+        Override this in a subclass where different configurations can be
+        reflections or rotations of one another.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return self
+
     def is_solved(self):
         """
         Return True iff Puzzle self is solved.
@@ -39,3 +56,16 @@ class Puzzle:
         @rtype: list[Puzzle]
         """
         raise NotImplementedError
+
+    def iter_extensions(self):
+        """
+        Return an iterator over the legal extensions of Puzzle self.
+
+        Override this in a subclass that can make its extensions one at a
+        time as they're needed, so that a solver that stops partway
+        through them doesn't pay for the rest.
+
+        @type self: Puzzle
+        @rtype: iterator[Puzzle]
+        """
+        return iter(self.extensions())
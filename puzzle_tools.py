@@ -2,141 +2,254 @@
 Some functions for working with puzzles
 """
 from puzzle import Puzzle
-from collections import deque
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
-# uncomment the next two lines on a unix platform
-# import resource
-# resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
-import sys
-sys.setrecursionlimit(10**6)
+from collections import deque, OrderedDict
 
 
-def depth_first_solve(puzzle):
+def depth_first_solve(puzzle, max_seen=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    If max_seen is given, remember at most that many of the most recently
+    seen configurations, so that memory stays bounded in long searches at
+    the cost of searching some configurations more than once. Once fewer
+    can be remembered than can be reached, the search only avoids going
+    round in cycles, and may try every path without one, so it can take
+    exponentially longer, especially when there is no solution.
+
     @type puzzle: Puzzle
+    @type max_seen: int | None
     @rtype: PuzzleNode
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), \
+                         (("1", "2", "3"), ("4", "5", "*")))
+    >>> node = depth_first_solve(start, max_seen=4)
+    >>> node.puzzle == start
+    True
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> node.puzzle.is_solved()
+    True
     """
 
-    def _depth_first_solve(puzz, seen=()):
-        """
-        Return PuzzleNode that's first in a path of PuzzleNodes that lead to
-        solution, or None if no solution found.
+    # if puzzle impossible, there's no solution
+    if puzzle.fail_fast():
+        return None
 
-        @type puzz: Puzzle
-        @type seen: tuple(Puzzle)
-        @rtype: PuzzleNode | None
-        """
-        # initialize the current node
-        curr_node = PuzzleNode(puzz)
+    # if puzzle already solved, it's the whole solution
+    elif puzzle.is_solved():
+        return PuzzleNode(puzzle, in_solution=True)
+
+    # initialize set of already seen puzzle configs, shared by the whole
+    # search so that each configuration is expanded at most once; puzzles
+    # are identified up to symmetry by their canonical keys
+    seen = _seen_set(max_seen)
+    seen.add(puzzle.canonical())
+
+    # if seen may forget configurations, also keep the keys of those on the
+    # current path, so the search can't go round in cycles
+    on_path = None if max_seen is None else {puzzle.canonical()}
+
+    # only puzzles that override Puzzle.fail_fast can ever fail fast, so
+    # don't call it for each extension of those that don't (extensions are
+    # assumed to be the same kind of puzzle as the one they extend)
+    check_fail_fast = type(puzzle).fail_fast is not Puzzle.fail_fast
+
+    # stack of nodes on the current path from PuzzleNode(puzzle), each with
+    # an iterator over the extensions of its puzzle still to be searched
+    stack = [(PuzzleNode(puzzle), puzzle.iter_extensions())]
+
+    while stack:
+        curr_node, extensions = stack[-1]
+        p = next(extensions, None)
+
+        # if every extension was searched without a solution, backtrack
+        if p is None:
+            stack.pop()
+            if on_path is not None:
+                on_path.discard(curr_node.puzzle.canonical())
+            continue
+
+        key = p.canonical()
 
         # ignore previously seen puzzle config
-        if puzz in [x.puzzle for x in seen]:
-            return
+        if key in seen or (on_path is not None and key in on_path):
+            continue
 
         # if puzzle impossible, ignore it
-        elif puzz.fail_fast():
-            # update seen
-            seen += (curr_node,)
-            return
+        elif check_fail_fast and p.fail_fast():
+            seen.add(key)
 
-        # if solution found, add the current node to the solution
-        elif puzz.is_solved():
-            curr_node.in_solution = True
-            return curr_node
+        # if solution found, add the nodes on the path to it to the solution,
+        # assigning each node's child and parent, and return the first one
+        elif p.is_solved():
+            new_node = PuzzleNode(p, in_solution=True)
+            for curr_node, extensions in reversed(stack):
+                curr_node.children.append(new_node)
+                new_node.parent = curr_node
+                curr_node.in_solution = True
+                new_node = curr_node
+            return new_node
 
+        # otherwise search p's extensions next (perform a depth search)
         else:
-            # update seen
-            seen += (curr_node,)
-            # make a recursive call for each puzzle extension
-            # (perform a depth search)
-            for p in puzz.extensions():
-                # initialize the new node
-                new_node = _depth_first_solve(p, seen=seen)
-                # if solution found, add it to the children of the current node,
-                # and exit the loop early since there's no need to continue
-                # looking for additional solutions
-                if new_node and new_node.in_solution:
-                    curr_node.children.append(new_node)
-                    break
-
-            for p in curr_node.children:
-                # if curr_node has a child ...
-                if p and p.in_solution:
-                    # ... assign curr_node's child's parent to be curr_node
-                    p.parent = curr_node
-                    # add curr_node to the solution
-                    curr_node.in_solution = True
-
-            # return the current node if it's a solution, or None if the puzzle
-            # couldn't be solved
-            return curr_node if curr_node.in_solution else None
-
-    # use _depth_first_solve on puzzle to find first node of solution
-    return _depth_first_solve(puzzle)
-
-def breadth_first_solve(puzzle):
+            seen.add(key)
+            if on_path is not None:
+                on_path.add(key)
+            stack.append((PuzzleNode(p), p.iter_extensions()))
+
+    # no solution was found
+    return None
+
+
+def breadth_first_solve(puzzle, max_seen=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    If max_seen is given, remember at most that many of the most recently
+    seen configurations, so that memory stays bounded in long searches at
+    the cost of searching some configurations more than once. A search
+    bounded this way may not finish when there is no solution.
+
     @type puzzle: Puzzle
+    @type max_seen: int | None
     @rtype: PuzzleNode
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), \
+                         (("1", "2", "3"), ("4", "5", "*")))
+    >>> node, length = breadth_first_solve(start, max_seen=4), 1
+    >>> while node.children:
+    ...     node, length = node.children[0], length + 1
+    >>> node.puzzle.is_solved(), length
+    (True, 4)
     """
     def _breadth_first_solve(puzz):
         """
-        Return PuzzleNode that's first in a path of PuzzleNodes that lead to
-        solution, or None if no solution found.
+        Return the entry of the first solution reached from puzz, or None if
+        no solution found. Each entry is a (puzzle, entry it was extended
+        from) pair, so that PuzzleNodes only have to be made for the
+        solution's path.
 
         @type puzz: Puzzle
-        @rtype: PuzzleNode | None
+        @rtype: (Puzzle, tuple | None) | None
         """
-        # initialize tuple of already seen puzzle configs
-        seen = ()
+        # if puzz already solved, it's the whole solution
+        if puzz.is_solved():
+            return puzz, None
 
-        # initialize deque of puzzle nodes to evaluate for solution
-        q = deque()
+        # initialize set of already seen puzzle configs, identified up to
+        # symmetry by their canonical keys
+        seen = _seen_set(max_seen)
+        seen.add(puzz.canonical())
 
-        # assign current node, and add it to queue
-        curr_node = PuzzleNode(puzz)
-        q.append(curr_node)
+        # initialize deque of entries to extend, starting with puzz's
+        q = deque([(puzz, None)])
 
-        # keep checking next node until solution found or the queue is empty
-        while not curr_node.puzzle.is_solved() and len(q) > 0:
-            curr_node = q.popleft()
-            seen += (curr_node.puzzle,)
+        # keep extending the next entry until the queue is empty
+        while q:
+            curr_entry = q.popleft()
 
-            for p in curr_node.puzzle.extensions():
+            for p in curr_entry[0].iter_extensions():
+                key = p.canonical()
                 # don't bother with already seen puzzles
-                if p not in seen:
-                    new_node = PuzzleNode(p)
+                if key not in seen:
                     # form parent relationship
-                    new_node.parent = curr_node
+                    new_entry = (p, curr_entry)
+                    # stop as soon as a solution is generated, rather than
+                    # generating the rest of its level first
+                    if p.is_solved():
+                        return new_entry
                     # add extensions from next level to back of queue
-                    q.append(new_node)
-                    seen += (new_node.puzzle,)
-
-        # if final node removed from q was the solution, then create a chain of
-        # nodes using the parent relationship, and assigning the children
-        if curr_node.puzzle.is_solved():
-            # keep assigning children up until the root (top node), then return
-            # it
-            while curr_node.parent:
-                curr_node.parent.children.append(curr_node)
-                curr_node = curr_node.parent
-            return curr_node
-
-        # must have been the case that no solution was found otherwise, so
-        # return None
-        else:
-            return None
+                    q.append(new_entry)
+                    seen.add(key)
+
+        # no solution found
+        return None
+
+    curr_entry = _breadth_first_solve(puzzle)
+
+    # if no solution was found, return None
+    if curr_entry is None:
+        return None
 
-    return _breadth_first_solve(puzzle)
+    # otherwise create a chain of nodes following the parent relationship,
+    # assigning the children up until the root (top node), then return it
+    curr_node, curr_entry = PuzzleNode(curr_entry[0]), curr_entry[1]
+    while curr_entry:
+        curr_node.parent = PuzzleNode(curr_entry[0], [curr_node])
+        curr_node, curr_entry = curr_node.parent, curr_entry[1]
+    return curr_node
+
+
+def _seen_set(max_seen):
+    """
+    Return an empty set for a solver to record the configurations it has
+    seen, holding at most max_seen of them unless max_seen is None.
+
+    @type max_seen: int | None
+    @rtype: set | _LRUSet
+    """
+    return set() if max_seen is None else _LRUSet(max_seen)
+
+
+class _LRUSet(OrderedDict):
+    """
+    A set of at most maxsize keys, which forgets its least recently added
+    or found key to make room for a new one.
+    """
+
+    def __init__(self, maxsize):
+        """
+        Create a new empty _LRUSet self holding at most maxsize keys.
+
+        @type self: _LRUSet
+        @type maxsize: int
+        @rtype: None
+        """
+        assert maxsize > 0
+        OrderedDict.__init__(self)
+        self.maxsize = maxsize
+
+    def __contains__(self, key):
+        """
+        Return whether key is in _LRUSet self, marking it as recently used.
+
+        @type self: _LRUSet
+        @type key: object
+        @rtype: bool
+
+        >>> s = _LRUSet(2)
+        >>> s.add(1)
+        >>> s.add(2)
+        >>> 1 in s
+        True
+        >>> s.add(3)
+        >>> [x in s for x in (1, 2, 3)]
+        [True, False, True]
+        """
+        if OrderedDict.__contains__(self, key):
+            self.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key):
+        """
+        Add key to _LRUSet self, forgetting the least recently used key if
+        self is full.
+
+        @type self: _LRUSet
+        @type key: object
+        @rtype: None
+        """
+        self[key] = None
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
 
 
 # Class PuzzleNode helps build trees of PuzzleNodes that have
@@ -183,11 +296,23 @@ class PuzzleNode:
         True
         >>> pn1.__eq__(pn3)
         False
+        >>> pn4 = PuzzleNode(pn1.puzzle, [pn2, pn3])
+        >>> pn5 = PuzzleNode(pn1.puzzle, [pn3, pn2])
+        >>> pn4.__eq__(pn5)
+        True
         """
         return (type(self) == type(other) and
                 self.puzzle == other.puzzle and
-                all([x in self.children for x in other.children]) and
-                all([x in other.children for x in self.children]))
+                set(self.children) == set(other.children))
+
+    def __hash__(self):
+        """
+        Return a hash of PuzzleNode self, consistent with __eq__.
+
+        @type self: PuzzleNode
+        @rtype: int
+        """
+        return hash(self.puzzle)
 
     def __str__(self):
         """
@@ -195,5 +320,19 @@ class PuzzleNode:
 
         # doctest not feasible.
         """
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        # each node's puzzle is followed by a blank line and then its
+        # children, separated by newlines; walk the tree with a stack of
+        # nodes and separators still to be written, rather than recursing,
+        # so long solution paths don't exceed the recursion limit
+        lst, stack = [], [self]
+        while stack:
+            x = stack.pop()
+            if isinstance(x, str):
+                lst.append(x)
+            else:
+                lst.append("{}\n\n".format(x.puzzle))
+                for i in range(len(x.children) - 1, -1, -1):
+                    stack.append(x.children[i])
+                    if i > 0:
+                        stack.append("\n")
+        return "".join(lst)
@@ -55,6 +55,15 @@ class SudokuPuzzle(Puzzle):
                 self._n == other._n and self._symbols == other._symbols and
                 self._symbol_set == other._symbol_set)
 
+    def __hash__(self):
+        """
+        Return a hash of SudokuPuzzle self, consistent with __eq__.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+        """
+        return hash(tuple(self._symbols))
+
     def __str__(self):
         """
         Return a human-readable string representation of SudokuPuzzle self.
@@ -175,11 +184,14 @@ class SudokuPuzzle(Puzzle):
                                (self._row_set(i) |
                                 self._column_set(i) |
                                 self._subsquare_set(i)))
-            # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+            # list of SudokuPuzzles with each legal digit at position i,
+            # each made from a copy of symbols with only position i changed
+            lst = []
+            for d in allowed_symbols:
+                new_symbols = symbols[:]
+                new_symbols[i] = d
+                lst.append(SudokuPuzzle(n, new_symbols, symbol_set))
+            return lst
 
     def fail_fast(self):
         """
@@ -209,15 +221,20 @@ class SudokuPuzzle(Puzzle):
         # an available symbol
         position_results = []
 
-        for m in range(len(self._symbols)):
+        # convenient names
+        symbols, symbol_set = self._symbols, self._symbol_set
+
+        for m in range(len(symbols)):
             # only check open positions
-            if self._symbols[m] == "*":
+            if symbols[m] == "*":
+                # symbols already used in position m's row, column and
+                # subsquare, which are the same for every candidate symbol
+                used_symbols = (self._row_set(m) | self._column_set(m) |
+                                self._subsquare_set(m))
                 # no symbol found yet to fill position m
                 symbol_found = False
-                for symbol in self._symbol_set:
-                    if not (symbol in self._row_set(m) |
-                            self._column_set(m) |
-                            self._subsquare_set(m)):
+                for symbol in symbol_set:
+                    if symbol not in used_symbols:
                         # available symbol found for position m
                         symbol_found = True
                 position_results.append(symbol_found)
@@ -1,4 +1,12 @@
 from puzzle import Puzzle
+from puzzle_tools import PuzzleNode
+from heapq import heappush, heappop
+from operator import ne
+import weakref
+
+# for each word set in use, keyed by its id: a weak reference to it, and a
+# dict mapping word lengths and allowed characters to its _WordGraph
+_graph_cache = {}
 
 
 class WordLadderPuzzle(Puzzle):
@@ -6,21 +14,36 @@ class WordLadderPuzzle(Puzzle):
     A word-ladder puzzle that may be solved, unsolved, or even unsolvable.
     """
 
+    # set of characters to use for 1-character changes, the same for every
+    # puzzle
+    _chars = "abcdefghijklmnopqrstuvwxyz"
+
+    # searches make many puzzles, so keep them small and quick to fill in
+    __slots__ = ("_from_word", "_to_word", "_word_set", "_graph",
+                 "_fail_fast")
+
     def __init__(self, from_word, to_word, ws):
         """
         Create a new word-ladder puzzle with the aim of stepping
         from from_word to to_word using words in ws, changing one
         character at each step.
 
+        ws is shared, not copied, by self and all its extensions, and must
+        not change while they're in use, so a frozenset suits it best.
+
         @type from_word: str
         @type to_word: str
-        @type ws: set[str]
+        @type ws: set[str] | frozenset[str]
         @rtype: None
         """
         (self._from_word, self._to_word, self._word_set) = (from_word,
                                                             to_word, ws)
-        # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        # neighbor graph of ws's words as long as from_word, shared with
+        # all extensions and looked up the first time it's needed
+        self._graph = None
+        # words of different lengths can never be stepped between, and
+        # extensions keep from_word's length, so this never changes
+        self._fail_fast = len(from_word) != len(to_word)
 
     def __eq__(self, other):
         """
@@ -41,12 +64,24 @@ class WordLadderPuzzle(Puzzle):
         >>> w2 == w3
         False
         """
+        # puzzles from the same search share one word set, so check for
+        # that before comparing whole sets of words
         return (type(self) == type(other) and
                 self._from_word == other._from_word and
                 self._to_word == other._to_word and
-                self._word_set == other._word_set and
+                (self._word_set is other._word_set or
+                 self._word_set == other._word_set) and
                 self._chars == other._chars)
 
+    def __hash__(self):
+        """
+        Return a hash of WordLadderPuzzle self, consistent with __eq__.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+        """
+        return hash(self._from_word)
+
     def __str__(self):
         """
         Return a string representation of WordLadderPuzzle self.
@@ -65,6 +100,9 @@ class WordLadderPuzzle(Puzzle):
         """
         Return list of extensions of WordLadderPuzzle self.
 
+        A solved puzzle has no extensions, as there's nothing left to step
+        towards.
+
         Overrides Puzzle.extensions
 
         @type self: WordLadderPuzzle
@@ -75,20 +113,44 @@ class WordLadderPuzzle(Puzzle):
         >>> w1.extensions() == [WordLadderPuzzle("cast", "save", \
                                 {"cost", "cast", "case", "cave", "save"})]
         True
+        >>> WordLadderPuzzle("save", "save", {"cave", "save"}).extensions()
+        []
         """
-        # list accumulator for all extensions
-        lst = []
+        return list(self.iter_extensions())
 
-        # check each letter of self._from_word
-        for i in range(len(self._from_word)):
-            # check each available character for current letter
-            for c in self._chars:
-                new_word = self._from_word[:i] + c + self._from_word[i + 1:]
-                if new_word in self._word_set and new_word != self._from_word:
-                    lst.append(WordLadderPuzzle(new_word, self._to_word,
-                                                self._word_set))
+    def iter_extensions(self):
+        """
+        Return an iterator over the extensions of WordLadderPuzzle self,
+        making them one at a time as they're needed.
 
-        return lst
+        Overrides Puzzle.iter_extensions
+
+        @type self: WordLadderPuzzle
+        @rtype: iterator[WordLadderPuzzle]
+
+        >>> w1 = WordLadderPuzzle("cost", "save", \
+        {"cost", "cast", "case", "cave", "save"})
+        >>> list(w1.iter_extensions()) == w1.extensions()
+        True
+        """
+        # the words one allowed change away from from_word, looked up in the
+        # neighbor graph of ws's words as long as from_word
+        from_word, to_word, ws = self._from_word, self._to_word, self._word_set
+        if from_word == to_word:
+            return
+        chars, graph, fail_fast = self._chars, self._graph, self._fail_fast
+        if graph is None:
+            graph = self._graph = _word_graph(ws, len(from_word), chars)
+
+        # every extension shares self's target, words and graph, so set them
+        # directly rather than through __init__
+        for new_word in graph[from_word]:
+            new_puzzle = WordLadderPuzzle.__new__(WordLadderPuzzle)
+            (new_puzzle._from_word, new_puzzle._to_word,
+             new_puzzle._word_set) = (new_word, to_word, ws)
+            new_puzzle._graph = graph
+            new_puzzle._fail_fast = fail_fast
+            yield new_puzzle
 
     def is_solved(self):
         """
@@ -129,22 +191,328 @@ class WordLadderPuzzle(Puzzle):
         >>> w2.fail_fast()
         True
         """
-        return len(self._from_word) != len(self._to_word)
+        return self._fail_fast
+
+
+class _WordGraph(dict):
+    """
+    Map each word to the tuple of words one change away from it.
+
+    A neighbor of word has the same length and differs from it in exactly
+    one position, where it has one of the allowed characters; neighbors are
+    ordered by that position, then by that character. Each word's
+    neighbors are found the first time it's looked up.
+
+    >>> g = _WordGraph({"cost", "cast", "case", "cave", "save"}, \
+                       "abcdefghijklmnopqrstuvwxyz")
+    >>> g["cast"], g["cave"]
+    (('cost', 'case'), ('save', 'case'))
+    """
+
+    def __init__(self, words, chars):
+        """
+        Create a graph of the words in words with changes to chars.
+
+        @type self: _WordGraph
+        @type words: set[str]
+        @type chars: str
+        @rtype: None
+        """
+        dict.__init__(self)
+        # for each position, words with the letter there removed mapped to
+        # the words it was removed from
+        self._patterns = patterns = []
+        self._allowed = frozenset(chars)
+        for word in words:
+            while len(patterns) < len(word):
+                patterns.append({})
+            for i in range(len(word)):
+                at_i, key = patterns[i], word[:i] + word[i + 1:]
+                if key in at_i:
+                    at_i[key].append(word)
+                else:
+                    at_i[key] = [word]
+        # words sharing a pattern differ only where its letter was removed,
+        # so sorting them orders them by their letter there
+        for at_i in patterns:
+            for bucket in at_i.values():
+                if len(bucket) > 1:
+                    bucket.sort()
+
+    def __missing__(self, word):
+        """
+        Find, remember and return the neighbors of word.
+
+        @type self: _WordGraph
+        @type word: str
+        @rtype: tuple[str]
+        """
+        patterns, allowed, neighbors = self._patterns, self._allowed, []
+        for i in range(min(len(word), len(patterns))):
+            bucket = patterns[i].get(word[:i] + word[i + 1:])
+            # most patterns match no word but word itself, so reject those
+            # before looking through any
+            if bucket is None or (len(bucket) == 1 and bucket[0] == word):
+                continue
+            for new_word in bucket:
+                if new_word != word and new_word[i] in allowed:
+                    neighbors.append(new_word)
+        self[word] = neighbors = tuple(neighbors)
+        return neighbors
+
+    def predecessors(self, word):
+        """
+        Return the words in self that have word as a neighbor.
+
+        These are word's neighbors, except that the letter word has where
+        they differ must be allowed rather than theirs.
+
+        @type self: _WordGraph
+        @type word: str
+        @rtype: list[str]
+
+        >>> g = _WordGraph({"cost", "Cost", "most"}, \
+                           "abcdefghijklmnopqrstuvwxyz")
+        >>> g["Cost"], g.predecessors("Cost")
+        (('cost', 'most'), [])
+        >>> g["cost"], g.predecessors("cost")
+        (('most',), ['Cost', 'most'])
+        """
+        patterns, predecessors = self._patterns, []
+        for i in range(min(len(word), len(patterns))):
+            if word[i] in self._allowed:
+                for old_word in patterns[i].get(word[:i] + word[i + 1:], ()):
+                    if old_word != word:
+                        predecessors.append(old_word)
+        return predecessors
+
+
+def _word_graph(ws, length, chars):
+    """
+    Return the _WordGraph of the words in ws that have the given length.
+
+    Each graph is built once per ws and shared by all the
+    WordLadderPuzzles using ws, so ws must not change while they're in use.
+
+    @type ws: set[str] | frozenset[str]
+    @type length: int
+    @type chars: str
+    @rtype: _WordGraph
+
+    >>> _word_graph({"cost", "cast", "cat", "at"}, 4, "ao")["cast"]
+    ('cost',)
+    """
+    entry = _graph_cache.get(id(ws))
+    if entry is None or entry[0]() is not ws:
+        # forget ws's graphs as soon as ws itself is gone
+        entry = (weakref.ref(ws, lambda r, key=id(ws):
+                             _graph_cache.pop(key, None)), {})
+        _graph_cache[id(ws)] = entry
+    if (length, chars) not in entry[1]:
+        entry[1][(length, chars)] = _WordGraph(
+            [w for w in ws if len(w) == length], chars)
+    return entry[1][(length, chars)]
+
+
+def bidirectional_solve(puzzle):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, like breadth_first_solve, but searching from both ends of
+    the word ladder at once. Return None if this is not possible.
+
+    Each step extends whichever search has the smaller frontier by a whole
+    level, and the two stop as soon as they meet, so the path found is as
+    short as possible while only about the square root of the words
+    breadth_first_solve would visit are visited.
+
+    @type puzzle: WordLadderPuzzle
+    @rtype: PuzzleNode | None
+
+    >>> w = WordLadderPuzzle("cost", "save", \
+    {"cost", "cast", "case", "cave", "save", "most", "mast"})
+    >>> print(bidirectional_solve(w).puzzle)
+    cost -> save
+    >>> len(str(bidirectional_solve(w)).split())
+    15
+    >>> bidirectional_solve(WordLadderPuzzle("cost", "cist", \
+    {"cost", "cast", "most", "post"})) is None
+    True
+    """
+    if puzzle.fail_fast():
+        return None
+    from_word, to_word = puzzle._from_word, puzzle._to_word
+    if from_word == to_word:
+        return PuzzleNode(puzzle)
+    # every step lands on a word in ws, so a to_word that isn't one can't be
+    # reached, even though the backward search could step away from it
+    if to_word not in puzzle._word_set:
+        return None
+    graph = _word_graph(puzzle._word_set, len(from_word), puzzle._chars)
+
+    # words reached from each end, mapped to the word they were reached from
+    # on the way there, and the last level of them reached
+    forward, backward = {from_word: None}, {to_word: None}
+    forward_frontier, backward_frontier = [from_word], [to_word]
+    meeting = None
+    while meeting is None and forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            (reached, other, frontier, step) = (forward, backward,
+                                                forward_frontier,
+                                                graph.__getitem__)
+        else:
+            (reached, other, frontier, step) = (backward, forward,
+                                                backward_frontier,
+                                                graph.predecessors)
+        new_frontier = []
+        for word in frontier:
+            for new_word in step(word):
+                if new_word not in reached:
+                    reached[new_word] = word
+                    if new_word in other:
+                        meeting = new_word
+                        break
+                    new_frontier.append(new_word)
+            if meeting is not None:
+                break
+        if reached is forward:
+            forward_frontier = new_frontier
+        else:
+            backward_frontier = new_frontier
+
+    # no solution found
+    if meeting is None:
+        return None
+
+    # otherwise lay the ladder out from to_word back up to from_word
+    ladder, word = [], meeting
+    while word is not None:
+        ladder.append(word)
+        word = backward[word]
+    ladder.reverse()
+    word = forward[meeting]
+    while word is not None:
+        ladder.append(word)
+        word = forward[word]
+
+    return _ladder_solution(puzzle, ladder)
+
+
+def a_star_solve(puzzle):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, like breadth_first_solve, but extending first the words
+    that may lie on the shortest ladders. Return None if this is not
+    possible.
+
+    Each step changes one letter, so a word is at least as many steps from
+    to_word as the letters they differ in. Extending the word with the
+    fewest steps taken plus that many still to take (an A* search) finds
+    a shortest ladder without extending words that lead away from to_word.
+
+    @type puzzle: WordLadderPuzzle
+    @rtype: PuzzleNode | None
+
+    >>> w = WordLadderPuzzle("cost", "save", \
+    {"cost", "cast", "case", "cave", "save", "most", "mast"})
+    >>> print(a_star_solve(w).puzzle)
+    cost -> save
+    >>> len(str(a_star_solve(w)).split())
+    15
+    """
+    if puzzle.fail_fast():
+        return None
+    from_word, to_word = puzzle._from_word, puzzle._to_word
+    graph = _word_graph(puzzle._word_set, len(from_word), puzzle._chars)
+
+    # words reached, mapped to the word they were reached from and to the
+    # fewest steps they've been reached in
+    parents, steps = {from_word: None}, {from_word: 0}
+    # heap of (steps taken plus least steps left, least steps left, word)
+    # entries, so that of equally promising words the nearest to to_word
+    # is extended first
+    distance = _distance(from_word, to_word)
+    heap = [(distance, distance, from_word)]
+    while heap:
+        total, distance, word = heappop(heap)
+        if word == to_word:
+            # lay the ladder out from to_word back up to from_word
+            ladder = []
+            while word is not None:
+                ladder.append(word)
+                word = parents[word]
+            return _ladder_solution(puzzle, ladder)
+        # skip entries for words since reached in fewer steps
+        if total - distance > steps[word]:
+            continue
+        new_steps = total - distance + 1
+        for new_word in graph[word]:
+            if new_word not in steps or new_steps < steps[new_word]:
+                parents[new_word], steps[new_word] = word, new_steps
+                distance = _distance(new_word, to_word)
+                heappush(heap, (new_steps + distance, distance, new_word))
+
+    # no solution found
+    return None
+
+
+def _distance(word, other_word):
+    """
+    Return the number of positions where word and other_word differ.
+
+    @type word: str
+    @type other_word: str
+    @rtype: int
+
+    >>> _distance("cost", "case")
+    2
+    """
+    return sum(map(ne, word, other_word))
+
+
+def _ladder_solution(puzzle, ladder):
+    """
+    Return the root of a chain of PuzzleNodes, one for each word of ladder,
+    from the last at the root, which holds puzzle itself, to the first.
+
+    @type puzzle: WordLadderPuzzle
+    @type ladder: list[str]
+    @rtype: PuzzleNode
+    """
+    # create the chain from the bottom up, then return its root
+    to_word, ws, curr_node = puzzle._to_word, puzzle._word_set, None
+    for word in ladder[:-1]:
+        new_node = PuzzleNode(WordLadderPuzzle(word, to_word, ws))
+        if curr_node is not None:
+            new_node.children.append(curr_node)
+            curr_node.parent = new_node
+        curr_node = new_node
+    if curr_node is None:
+        return PuzzleNode(puzzle)
+    curr_node.parent = PuzzleNode(puzzle, [curr_node])
+    return curr_node.parent
 
 
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
-    from puzzle_tools import breadth_first_solve, depth_first_solve
+    from puzzle_tools import depth_first_solve
     from time import time
+    # read words.txt a line at a time, rather than into one string and then
+    # a list of its words
     with open("words.txt", "r") as words:
-        word_set = set(words.read().split())
+        word_set = frozenset(word for line in words for word in line.split())
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
-    sol = breadth_first_solve(w)
+    sol = bidirectional_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using bidirectional breadth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))
+    start = time()
+    sol = a_star_solve(w)
     end = time()
     print("Solving word ladder from same->cost")
-    print("...using breadth-first-search")
+    print("...using A* search")
     print("Solutions: {} took {} seconds.".format(sol, end - start))
     start = time()
     sol = depth_first_solve(w)